@@ -1,6 +1,11 @@
 """
 LLM-Based ATS & Resume Builder - Main Streamlit Application
 """
+import asyncio
+import re
+import threading
+import pyarrow as pa
+import pyarrow.compute as pc
 import streamlit as st
 import logging
 from datetime import datetime
@@ -24,33 +29,85 @@ st.set_page_config(
 )
 
 
+@st.cache_resource
+def get_config():
+    """Load configuration and set up logging once per process"""
+    # Ensure directory structure
+    ensure_directories()
+    
+    config = load_config()
+    setup_logging(config)
+    logging.info("Application started")
+    return config
+
+
+@st.cache_resource
+def get_prompts(prompts_path):
+    """Load and compile prompt templates once per process"""
+    return load_prompts(prompts_path)
+
+
+@st.cache_resource
+def get_llm_handler(_config):
+    """Create the LLM handler shared by all sessions"""
+    llm_handler = LLMHandler(_config)
+    
+    # Download the quantized model variant in the background
+    if (llm_handler.quantization and _config['ollama'].get('auto_pull_quantized')
+            and llm_handler.check_connection()):
+        threading.Thread(
+            target=llm_handler.pull_model,
+            args=(llm_handler.quantized_model_name(),),
+            daemon=True
+        ).start()
+    
+    return llm_handler
+
+
+@st.cache_resource
+def get_resume_parser():
+    """Create the resume parser shared by all sessions"""
+    return ResumeParser()
+
+
+@st.cache_resource
+def get_ats_analyzer(_llm_handler, _prompts, _config):
+    """Create the ATS analyzer (with its caches and scheduler) shared by all sessions"""
+    return ATSAnalyzer(_llm_handler, _prompts, _config)
+
+
+@st.cache_resource
+def get_resume_generator(_llm_handler, _prompts, _config):
+    """Create the resume generator shared by all sessions"""
+    return ResumeGenerator(_llm_handler, _prompts, _config)
+
+
+@st.cache_resource
+def get_csv_manager(csv_path):
+    """Create the CSV manager shared by all sessions"""
+    return CSVManager(csv_path)
+
+
 def initialize_app():
     """Initialize application components"""
     if 'initialized' not in st.session_state:
-        # Ensure directory structure
-        ensure_directories()
-        
         # Load configuration
-        config = load_config()
+        config = get_config()
         st.session_state.config = config
         
-        # Setup logging
-        setup_logging(config)
-        logging.info("Application started")
-        
         # Load prompts
-        prompts = load_prompts(config['paths']['prompts'])
+        prompts = get_prompts(config['paths']['prompts'])
         st.session_state.prompts = prompts
         
         # Initialize LLM handler
-        llm_handler = LLMHandler(config)
+        llm_handler = get_llm_handler(config)
         st.session_state.llm_handler = llm_handler
         
         # Initialize other components
-        st.session_state.resume_parser = ResumeParser()
-        st.session_state.ats_analyzer = ATSAnalyzer(llm_handler, prompts, config)
-        st.session_state.resume_generator = ResumeGenerator(llm_handler, prompts)
-        st.session_state.csv_manager = CSVManager(config['paths']['applications_csv'])
+        st.session_state.resume_parser = get_resume_parser()
+        st.session_state.ats_analyzer = get_ats_analyzer(llm_handler, prompts, config)
+        st.session_state.resume_generator = get_resume_generator(llm_handler, prompts, config)
+        st.session_state.csv_manager = get_csv_manager(config['paths']['applications_csv'])
         
         # Load base resume if exists
         base_resume = load_base_resume(config)
@@ -62,6 +119,13 @@ def initialize_app():
         st.session_state.initialized = True
 
 
+def use_session_llm(llm_handler):
+    """Point this session's analyzer and generator at its own LLM handler"""
+    st.session_state.llm_handler = llm_handler
+    st.session_state.ats_analyzer = st.session_state.ats_analyzer.with_llm(llm_handler)
+    st.session_state.resume_generator = st.session_state.resume_generator.with_llm(llm_handler)
+
+
 def sidebar():
     """Render sidebar"""
     st.sidebar.title("⚙️ Settings")
@@ -73,16 +137,40 @@ def sidebar():
         st.sidebar.error("❌ Ollama Not Connected")
         st.sidebar.info("Please start Ollama and refresh the page")
     
-    # Model selection
-    available_models = st.session_state.llm_handler.list_models()
+    # Model selection (per session: the cached handler is shared by every user)
+    llm_handler = st.session_state.llm_handler
+    model = llm_handler.model
+    available_models = llm_handler.list_models()
     if available_models:
-        selected_model = st.sidebar.selectbox(
+        default_model = llm_handler.preferred_model(
+            available_models, st.session_state.config['ollama']['model']
+        )
+        model = st.sidebar.selectbox(
             "Select LLM Model",
             available_models,
-            index=available_models.index(st.session_state.config['ollama']['model']) 
-                  if st.session_state.config['ollama']['model'] in available_models else 0
+            index=available_models.index(default_model) 
+                  if default_model in available_models else 0
         )
-        st.session_state.llm_handler.model = selected_model
+    
+    configured_keep_alive = st.session_state.config['ollama'].get('keep_alive', '')
+    keep_warm = st.sidebar.toggle(
+        "Keep model warm",
+        value=bool(configured_keep_alive),
+        key="keep_model_warm",
+        disabled=not configured_keep_alive,
+        help=f"Ask Ollama to keep the model loaded for {configured_keep_alive or 'its default time'} between requests"
+    )
+    keep_alive = configured_keep_alive if keep_warm else ''
+    
+    if (model, keep_alive) != (llm_handler.model, llm_handler.keep_alive):
+        use_session_llm(llm_handler.with_settings(model=model, keep_alive=keep_alive))
+    
+    # Load the selected model in the background so the first analysis isn't cold
+    if (st.session_state.ollama_connected
+            and st.session_state.config['ollama'].get('warm_up', True)
+            and st.session_state.get('warmed_model') != st.session_state.llm_handler.model):
+        st.session_state.warmed_model = st.session_state.llm_handler.model
+        threading.Thread(target=st.session_state.llm_handler.warm_up, daemon=True).start()
     
     st.sidebar.divider()
     
@@ -120,6 +208,14 @@ def sidebar():
         st.sidebar.metric("Resumes Created", stats['resumes_created'])
         if stats['average_score'] > 0:
             st.sidebar.metric("Average ATS Score", f"{stats['average_score']}")
+    
+    # LLM cache statistics
+    cache_stats = st.session_state.ats_analyzer.llm.get_stats()
+    col1, col2 = st.sidebar.columns(2)
+    with col1:
+        st.metric("Cache Hits", cache_stats['hits'])
+    with col2:
+        st.metric("Cache Misses", cache_stats['misses'])
 
 
 def main_content():
@@ -246,15 +342,40 @@ def resume_review_tab():
             analyze_resume(resume_text)
 
 
+def warn_if_truncated(**fields):
+    """Tell the user when inputs are longer than their prompt token budget"""
+    truncated = st.session_state.ats_analyzer.truncated_fields(**fields)
+    if truncated:
+        labels = {'resume_text': 'resume', 'job_description': 'job description'}
+        names = " and ".join(labels.get(name, name) for name in truncated)
+        st.warning(
+            f"✂️ The {names} exceeded the prompt budget (ollama.max_prompt_tokens) "
+            "and only the beginning was analyzed"
+        )
+
+
 def analyze_resume(resume_text):
     """Analyze resume and display results"""
-    with st.spinner("Analyzing your resume..."):
-        feedback = st.session_state.ats_analyzer.review_resume(resume_text)
+    st.markdown("### 📋 Resume Feedback")
+    placeholder = st.empty()
+    placeholder.info("Analyzing your resume...")
+    
+    # Render feedback as it streams in
+    feedback = ""
+    for chunk in st.session_state.ats_analyzer.review_resume_stream(resume_text):
+        if chunk is None:
+            feedback = ""
+            break
+        feedback += chunk
+        placeholder.markdown(feedback)
     
     if feedback:
+        warn_if_truncated(resume_text=resume_text)
         st.success("✅ Analysis Complete!")
-        st.markdown("### 📋 Resume Feedback")
-        st.markdown(feedback)
+        
+        score = extract_score_from_response(feedback)
+        if score is not None:
+            st.metric("Resume Score", f"{score}/100")
         
         # Download option
         st.download_button(
@@ -264,6 +385,7 @@ def analyze_resume(resume_text):
             mime="text/plain"
         )
     else:
+        placeholder.empty()
         st.error("Failed to analyze resume. Please check Ollama connection.")
 
 
@@ -315,21 +437,45 @@ def ats_analysis_tab():
             key="ats_company"
         )
     
-    # Analyze button
-    if st.button("📊 Calculate ATS Score", type="primary", disabled=not (resume_text and jd_text)):
-        analyze_ats_score(resume_text, jd_text, company_name)
+    # Analyze buttons
+    can_analyze = bool(resume_text and jd_text)
+    btn_col1, btn_col2 = st.columns([1, 3])
+    with btn_col1:
+        analyze_clicked = st.button("📊 Calculate ATS Score", type="primary", disabled=not can_analyze)
+    with btn_col2:
+        rescore_clicked = st.button(
+            "🔄 Re-score",
+            disabled=not can_analyze,
+            help="Ask the model for a fresh score instead of reusing the last result for this resume and job description"
+        )
+    
+    if analyze_clicked or rescore_clicked:
+        analyze_ats_score(resume_text, jd_text, company_name, regenerate=rescore_clicked)
+    
+    # Batch scoring
+    with st.expander("📚 Batch ATS Scoring"):
+        st.caption("Score the selected resume against several job descriptions at once. "
+                   "Separate job descriptions with a line containing only ---")
+        batch_jd_text = st.text_area("Job descriptions", height=250, key="ats_batch_jds")
+        
+        if st.button("📊 Score All", disabled=not (resume_text and batch_jd_text.strip())):
+            batch_analyze_ats_scores(resume_text, batch_jd_text)
 
 
-def analyze_ats_score(resume_text, jd_text, company_name):
+def analyze_ats_score(resume_text, jd_text, company_name, regenerate=False):
     """Perform ATS analysis and display results"""
     background = st.session_state.get('background', None)
     
     with st.spinner("Analyzing ATS compatibility..."):
-        score, feedback = st.session_state.ats_analyzer.analyze_ats_score(
-            resume_text, jd_text, background
-        )
+        analysis = asyncio.run(st.session_state.ats_analyzer.full_analysis(
+            resume_text, jd_text, background, regenerate
+        ))
+    
+    score, feedback = analysis['score'], analysis['feedback']
     
     if feedback:
+        warn_if_truncated(resume_text=resume_text, job_description=jd_text)
+        
         # Display score prominently
         col1, col2, col3 = st.columns(3)
         
@@ -351,6 +497,14 @@ def analyze_ats_score(resume_text, jd_text, company_name):
         st.markdown("### 📋 Detailed Analysis")
         st.markdown(feedback)
         
+        if analysis['gaps']:
+            with st.expander("🧩 Gap Analysis"):
+                st.markdown(analysis['gaps'])
+        
+        if analysis['keywords']:
+            with st.expander("🔑 Job Description Keywords"):
+                st.markdown(analysis['keywords'])
+        
         # Save to CSV
         if company_name:
             # Extract key improvements from feedback
@@ -377,6 +531,32 @@ def analyze_ats_score(resume_text, jd_text, company_name):
         st.error("Failed to perform ATS analysis. Check Ollama connection.")
 
 
+def batch_analyze_ats_scores(resume_text, batch_jd_text):
+    """Score resume against multiple job descriptions and display a summary"""
+    background = st.session_state.get('background', None)
+    job_descriptions = [
+        jd.strip() for jd in re.split(r'^\s*---\s*$', batch_jd_text, flags=re.MULTILINE)
+        if jd.strip()
+    ]
+    
+    with st.spinner(f"Scoring {len(job_descriptions)} job descriptions..."):
+        results = st.session_state.ats_analyzer.batch_analyze_ats_score(
+            resume_text, job_descriptions, background
+        )
+    
+    for i, (jd, (score, feedback)) in enumerate(zip(job_descriptions, results), start=1):
+        category = get_score_category(score)
+        score_label = f"{score}/100" if score is not None else "N/A"
+        
+        st.markdown(f"#### #{i} · {score_label} · {category}")
+        st.caption(truncate_text(jd, 150))
+        if feedback:
+            warn_if_truncated(resume_text=resume_text, job_description=jd)
+            st.markdown(feedback)
+        else:
+            st.error("Failed to analyze this job description. Check Ollama connection.")
+
+
 def generate_resume_tab():
     """Tab for generating tailored resumes"""
     st.header("✨ Generate Tailored Resume")
@@ -415,11 +595,22 @@ def generate_resume_tab():
         preview = truncate_text(st.session_state.base_resume, 200)
         st.text_area("", preview, height=150, disabled=True, key="gen_preview")
     
-    if st.button("✨ Generate Tailored Resume", type="primary", disabled=not (jd_for_gen and company_for_gen)):
-        generate_resume(jd_for_gen, company_for_gen, use_background)
+    can_generate = bool(jd_for_gen and company_for_gen)
+    btn_col1, btn_col2 = st.columns([1, 3])
+    with btn_col1:
+        generate_clicked = st.button("✨ Generate Tailored Resume", type="primary", disabled=not can_generate)
+    with btn_col2:
+        regenerate_clicked = st.button(
+            "🔄 Regenerate",
+            disabled=not can_generate,
+            help="Ask the model for a new draft instead of reusing the last result for this job description"
+        )
+    
+    if generate_clicked or regenerate_clicked:
+        generate_resume(jd_for_gen, company_for_gen, use_background, regenerate=regenerate_clicked)
 
 
-def generate_resume(jd_text, company_name, use_background):
+def generate_resume(jd_text, company_name, use_background, regenerate=False):
     """Generate tailored resume"""
     background = st.session_state.get('background') if use_background else None
     
@@ -427,7 +618,8 @@ def generate_resume(jd_text, company_name, use_background):
         generated = st.session_state.resume_generator.generate_tailored_resume(
             st.session_state.base_resume,
             jd_text,
-            background
+            background,
+            regenerate=regenerate
         )
     
     if generated:
@@ -498,7 +690,12 @@ def applications_tab():
         # Filter dataframe
         display_df = df
         if search_company:
-            display_df = display_df[display_df['company'].str.contains(search_company, case=False, na=False)]
+            # Literal, case-insensitive substring scan in Arrow (no per-row regex)
+            companies = pc.cast(pa.array(display_df['company'], from_pandas=True), pa.string())
+            mask = pc.fill_null(
+                pc.match_substring(companies, search_company, ignore_case=True), False
+            )
+            display_df = display_df[mask.to_numpy(zero_copy_only=False)]
         
         if show_entries != "All":
             display_df = display_df.head(show_entries)
@@ -4,11 +4,8 @@ ATS Resume Builder Package
 __version__ = "1.0.0"
 __author__ = "Your Name"
 
-from .llm_handler import LLMHandler
-from .resume_parser import ResumeParser
-from .ats_analyzer import ATSAnalyzer
-from .resume_generator import ResumeGenerator
-from .csv_manager import CSVManager
+import importlib
+
 from .utils import (
     load_config,
     setup_logging,
@@ -18,8 +15,34 @@ from .utils import (
     load_base_resume
 )
 
+# Component classes are imported on first access (PEP 562) so that importing
+# the package doesn't load pandas, requests or the document parsers up front
+_LAZY_IMPORTS = {
+    'LLMHandler': '.llm_handler',
+    'CachedLLM': '.llm_cache',
+    'SemanticCache': '.semantic_cache',
+    'BatchScheduler': '.batch_scheduler',
+    'ResumeParser': '.resume_parser',
+    'ATSAnalyzer': '.ats_analyzer',
+    'ResumeGenerator': '.resume_generator',
+    'CSVManager': '.csv_manager',
+}
+
+
+def __getattr__(name):
+    """Import component classes on first access"""
+    if name in _LAZY_IMPORTS:
+        value = getattr(importlib.import_module(_LAZY_IMPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 __all__ = [
     'LLMHandler',
+    'CachedLLM',
+    'SemanticCache',
+    'BatchScheduler',
     'ResumeParser',
     'ATSAnalyzer',
     'ResumeGenerator',
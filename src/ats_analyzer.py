@@ -1,10 +1,43 @@
 """
 ATS Analyzer - Analyze resumes and provide ATS scores
 """
+import asyncio
+import copy
+import functools
 import logging
-from typing import Dict, Optional, Tuple
+import re
+from typing import Dict, Iterator, List, Optional, Tuple
 from src.llm_handler import LLMHandler
-from src.utils import extract_score_from_response
+from src.batch_scheduler import BatchScheduler
+from src.llm_cache import CachedLLM
+from src.semantic_cache import SemanticCache
+from src.utils import extract_score_from_response, count_tokens, truncate_to_token_budget
+
+
+# Candidate keyword tokens: words plus tech spellings like c++, c#, node.js, ci-cd
+_TOKEN_RE = re.compile(r"[a-z][a-z0-9+.#-]{1,30}")
+
+# Words that carry no skill signal in resumes or job descriptions
+_STOPWORDS = frozenset("""
+    a about above after again against all also am an and any are as at be because been
+    before being below between both but by can could did do does doing down during each
+    etc few for from further had has have having he her here hers herself him himself his
+    how i if in into is it its itself just me more most my myself no nor not now of off on
+    once only or other our ours ourselves out over own same she should so some such than
+    that the their theirs them themselves then there these they this those through to too
+    under until up very was we were what when where which while who whom why will with
+    would you your yours yourself yourselves
+    ability able across candidate candidates company experience including job knowledge
+    looking must new one plus preferred required requirements responsibilities role skills
+    strong team well within work working year years
+""".split())
+
+
+@functools.lru_cache(maxsize=256)
+def _tokenize(text: str) -> frozenset:
+    """Split text into a set of lowercase keyword tokens (cached per distinct text)"""
+    tokens = (token.rstrip('.-') for token in _TOKEN_RE.findall(text.lower()))
+    return frozenset(token for token in tokens if len(token) > 1 and token not in _STOPWORDS)
 
 
 class ATSAnalyzer:
@@ -19,11 +52,106 @@ class ATSAnalyzer:
             prompts: Prompt templates
             config: Configuration dict
         """
-        self.llm = llm_handler
+        cache_dir = config['paths'].get('cache_dir', 'data/cache')
+        cache_config = config.get('cache', {})
+        cache_enabled = cache_config.get('enabled', True)
+        self.llm = CachedLLM(
+            llm_handler,
+            cache_dir,
+            enabled=cache_enabled,
+            memory_entries=cache_config.get('memory_entries', 256)
+        )
+        self.semantic_cache = SemanticCache(
+            cache_dir,
+            max_entries=cache_config.get('semantic_max_entries', 10000),
+            enabled=cache_enabled
+        )
+        self.scheduler = BatchScheduler(config['ollama'].get('num_parallel', 4))
         self.prompts = prompts
         self.config = config
+        self.rebuild_score_interpretations()
         logging.info("ATS Analyzer initialized")
     
+    def with_llm(self, llm_handler: LLMHandler) -> 'ATSAnalyzer':
+        """
+        Copy of this analyzer that generates with another handler
+        
+        Caches, scheduler and score interpretations stay shared; use this for
+        per-session model settings instead of mutating the shared handler.
+        
+        Args:
+            llm_handler: LLM handler to generate with
+            
+        Returns:
+            New ATSAnalyzer instance
+        """
+        analyzer = copy.copy(self)
+        analyzer.llm = self.llm.with_llm(llm_handler)
+        return analyzer
+    
+    def _budget(self, name: str, text: str) -> str:
+        """Truncate a prompt field to its configured token budget"""
+        max_tokens = self.config['ollama'].get('max_prompt_tokens', {}).get(name)
+        if not max_tokens or not text:
+            return text
+        
+        truncated = truncate_to_token_budget(text, max_tokens)
+        if len(truncated) < len(text):
+            logging.info(f"Truncated {name} from ~{count_tokens(text)} to {max_tokens} tokens")
+        return truncated
+    
+    def truncated_fields(self, **fields: str) -> List[str]:
+        """
+        Find prompt fields that exceed their token budget
+        
+        Args:
+            **fields: Prompt field values keyed by name (e.g. job_description)
+            
+        Returns:
+            Names of the fields that will be truncated before dispatch
+        """
+        return [
+            name for name, text in fields.items()
+            if text and len(self._budget(name, text)) < len(text)
+        ]
+    
+    def _cache_namespace(self, template_name: str) -> str:
+        """Scope for semantic cache entries: responses only transfer within a model and template"""
+        return f"{self.llm.model}\0{template_name}"
+    
+    def _generate_cached(
+        self,
+        template_name: str,
+        template: Dict,
+        regenerate: bool = False,
+        **kwargs
+    ) -> Optional[str]:
+        """
+        Generate with a template, reusing feedback for inputs that differ only in whitespace
+        
+        Args:
+            template_name: Prompt template name
+            template: Prompt template
+            regenerate: Skip cached feedback and store a newly generated one
+            **kwargs: Variables to format into the template
+            
+        Returns:
+            Generated text or None if error
+        """
+        namespace = self._cache_namespace(template_name)
+        
+        if regenerate:
+            response = self.llm.generate_with_template(template, refresh=True, **kwargs)
+        else:
+            cached = self.semantic_cache.lookup(namespace, kwargs)
+            if cached is not None:
+                return cached
+            response = self.llm.generate_with_template(template, **kwargs)
+        
+        if response:
+            self.semantic_cache.add(namespace, kwargs, response)
+        return response
+    
     def review_resume(self, resume_text: str) -> Optional[str]:
         """
         Review resume without job description
@@ -36,6 +164,7 @@ class ATSAnalyzer:
         """
         try:
             logging.info("Starting resume review (no JD)")
+            resume_text = self._budget('resume_text', resume_text)
             
             template = self.prompts.get('resume_review')
             if not template:
@@ -58,11 +187,46 @@ class ATSAnalyzer:
             logging.error(f"Error in resume review: {str(e)}")
             return None
     
+    def review_resume_stream(self, resume_text: str) -> Iterator[Optional[str]]:
+        """
+        Review resume without job description, streaming the feedback
+        
+        Args:
+            resume_text: Resume content
+            
+        Yields:
+            Feedback chunks as they're generated (None if error)
+        """
+        logging.info("Starting streaming resume review (no JD)")
+        resume_text = self._budget('resume_text', resume_text)
+        
+        template = self.prompts.get('resume_review')
+        if not template:
+            logging.error("Resume review template not found")
+            yield None
+            return
+        
+        chunks = []
+        for chunk in self.llm.stream_with_template(template, resume_text=resume_text):
+            if chunk is None:
+                logging.error("LLM streaming failed for resume review")
+                yield None
+                return
+            chunks.append(chunk)
+            yield chunk
+        
+        if chunks:
+            logging.info("Resume review completed successfully")
+        else:
+            logging.error("LLM returned no feedback for resume review")
+            yield None
+    
     def analyze_ats_score(
         self,
         resume_text: str,
         job_description: str,
-        background: Optional[str] = None
+        background: Optional[str] = None,
+        regenerate: bool = False
     ) -> Tuple[Optional[int], Optional[str]]:
         """
         Analyze ATS compatibility and get score
@@ -71,34 +235,44 @@ class ATSAnalyzer:
             resume_text: Resume content
             job_description: Job description
             background: Optional candidate background
+            regenerate: Skip cached feedback and score the resume again
             
         Returns:
             Tuple of (score, detailed_feedback)
         """
         try:
             logging.info("Starting ATS score analysis")
+            resume_text = self._budget('resume_text', resume_text)
+            job_description = self._budget('job_description', job_description)
             
             # Choose template based on whether background is provided
             if background:
-                template = self.prompts.get('ats_scoring_with_background')
+                template_name = 'ats_scoring_with_background'
+                template = self.prompts.get(template_name)
                 if not template:
                     logging.warning("Background template not found, using standard")
-                    template = self.prompts.get('ats_scoring')
+                    template_name = 'ats_scoring'
+                    template = self.prompts.get(template_name)
                 
-                feedback = self.llm.generate_with_template(
+                feedback = self._generate_cached(
+                    template_name,
                     template,
+                    regenerate,
                     resume_text=resume_text,
                     job_description=job_description,
                     background=background
                 )
             else:
-                template = self.prompts.get('ats_scoring')
+                template_name = 'ats_scoring'
+                template = self.prompts.get(template_name)
                 if not template:
                     logging.error("ATS scoring template not found")
                     return None, None
                 
-                feedback = self.llm.generate_with_template(
+                feedback = self._generate_cached(
+                    template_name,
                     template,
+                    regenerate,
                     resume_text=resume_text,
                     job_description=job_description
                 )
@@ -133,6 +307,7 @@ class ATSAnalyzer:
         """
         try:
             logging.info("Extracting keywords from job description")
+            job_description = self._budget('job_description', job_description)
             
             template = self.prompts.get('keyword_extraction')
             if not template:
@@ -172,6 +347,8 @@ class ATSAnalyzer:
         """
         try:
             logging.info("Starting gap analysis")
+            resume_text = self._budget('resume_text', resume_text)
+            job_description = self._budget('job_description', job_description)
             
             template = self.prompts.get('gap_analysis')
             if not template:
@@ -195,6 +372,70 @@ class ATSAnalyzer:
             logging.error(f"Error in gap analysis: {str(e)}")
             return None
     
+    def batch_analyze_ats_score(
+        self,
+        resume_text: str,
+        job_descriptions: List[str],
+        background: Optional[str] = None,
+        regenerate: bool = False
+    ) -> List[Tuple[Optional[int], Optional[str]]]:
+        """
+        Analyze ATS compatibility against several job descriptions concurrently
+        
+        Args:
+            resume_text: Resume content
+            job_descriptions: Job descriptions to score against
+            background: Optional candidate background
+            regenerate: Skip cached feedback and score every job description again
+            
+        Returns:
+            List of (score, detailed_feedback) tuples, in input order
+        """
+        logging.info(f"Starting batch ATS analysis for {len(job_descriptions)} job descriptions")
+        
+        return self.scheduler.map(
+            lambda job_description: self.analyze_ats_score(
+                resume_text, job_description, background, regenerate
+            ),
+            job_descriptions
+        )
+    
+    async def full_analysis(
+        self,
+        resume_text: str,
+        job_description: str,
+        background: Optional[str] = None,
+        regenerate: bool = False
+    ) -> Dict[str, any]:
+        """
+        Run ATS scoring, gap analysis and keyword extraction concurrently
+        
+        Args:
+            resume_text: Resume content
+            job_description: Job description
+            background: Optional candidate background
+            regenerate: Skip cached ATS feedback and score the resume again
+            
+        Returns:
+            Dict with score, feedback, gaps and keywords
+        """
+        logging.info("Starting full ATS analysis")
+        
+        (score, feedback), gaps, keywords = await asyncio.gather(
+            asyncio.to_thread(
+                self.analyze_ats_score, resume_text, job_description, background, regenerate
+            ),
+            asyncio.to_thread(self.identify_gaps, resume_text, job_description),
+            asyncio.to_thread(self.extract_keywords, job_description)
+        )
+        
+        return {
+            'score': score,
+            'feedback': feedback,
+            'gaps': gaps,
+            'keywords': keywords
+        }
+    
     def quick_match_check(
         self,
         resume_text: str,
@@ -211,37 +452,23 @@ class ATSAnalyzer:
             Dict with match statistics
         """
         try:
-            resume_lower = resume_text.lower()
-            jd_lower = job_description.lower()
-            
-            # Extract common technical keywords and skills
-            common_keywords = [
-                'python', 'java', 'javascript', 'react', 'node', 'sql',
-                'aws', 'azure', 'docker', 'kubernetes', 'git',
-                'machine learning', 'data science', 'agile', 'scrum',
-                'leadership', 'management', 'communication'
-            ]
-            
-            matches = []
-            missing = []
+            resume_terms = _tokenize(resume_text)
+            jd_terms = _tokenize(job_description)
             
-            for keyword in common_keywords:
-                if keyword in jd_lower:
-                    if keyword in resume_lower:
-                        matches.append(keyword)
-                    else:
-                        missing.append(keyword)
+            # Every JD keyword is checked against the resume with set operations
+            matches = jd_terms & resume_terms
+            missing = jd_terms - resume_terms
             
-            match_rate = len(matches) / len(matches + missing) * 100 if (matches + missing) else 0
+            match_rate = len(matches) / len(jd_terms) * 100 if jd_terms else 0
             
             result = {
-                'matched_keywords': matches,
-                'missing_keywords': missing,
+                'matched_keywords': sorted(matches),
+                'missing_keywords': sorted(missing),
                 'match_rate': round(match_rate, 2),
-                'total_checked': len(matches + missing)
+                'total_checked': len(jd_terms)
             }
             
-            logging.info(f"Quick match: {match_rate:.2f}% ({len(matches)}/{len(matches + missing)})")
+            logging.info(f"Quick match: {match_rate:.2f}% ({len(matches)}/{len(jd_terms)})")
             return result
             
         except Exception as e:
@@ -253,6 +480,16 @@ class ATSAnalyzer:
                 'total_checked': 0
             }
     
+    def rebuild_score_interpretations(self):
+        """Precompute interpretations for every score (call after changing thresholds)"""
+        self._interp_unknown = {
+            'category': 'Unknown',
+            'interpretation': 'Unable to determine score',
+            'recommendation': 'Please try analyzing again',
+            'color': 'gray'
+        }
+        self._interp_table = [self._interpret_score(score) for score in range(101)]
+    
     def get_score_interpretation(self, score: Optional[int]) -> Dict[str, str]:
         """
         Get interpretation and recommendations based on score
@@ -261,16 +498,16 @@ class ATSAnalyzer:
             score: ATS score (0-100)
             
         Returns:
-            Dict with interpretation details
+            Dict with interpretation details (shared, treat as read-only)
         """
         if score is None:
-            return {
-                'category': 'Unknown',
-                'interpretation': 'Unable to determine score',
-                'recommendation': 'Please try analyzing again',
-                'color': 'gray'
-            }
-        
+            return self._interp_unknown
+        if type(score) is int and 0 <= score <= 100:
+            return self._interp_table[score]
+        return self._interpret_score(score)
+    
+    def _interpret_score(self, score: int) -> Dict[str, str]:
+        """Map a score to its interpretation using the configured thresholds"""
         thresholds = self.config['scoring']
         
         if score >= thresholds['excellent_threshold']:
@@ -0,0 +1,57 @@
+"""
+Batch Scheduler - Dispatch independent LLM requests concurrently
+"""
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Iterable, List
+
+
+class BatchScheduler:
+    """Scheduler that keeps up to batch_size LLM requests in flight"""
+    
+    def __init__(self, batch_size: int = 4):
+        """
+        Initialize batch scheduler
+        
+        Args:
+            batch_size: Maximum concurrent requests (match OLLAMA_NUM_PARALLEL)
+        """
+        self.batch_size = max(1, batch_size)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.batch_size,
+            thread_name_prefix="llm-batch"
+        )
+        logging.info(f"Batch scheduler initialized with batch size: {self.batch_size}")
+    
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """
+        Queue a request for concurrent execution
+        
+        Args:
+            fn: Callable issuing the LLM request
+            *args: Positional arguments for fn
+            **kwargs: Keyword arguments for fn
+            
+        Returns:
+            Future resolving to fn's result
+        """
+        return self._executor.submit(fn, *args, **kwargs)
+    
+    def map(self, fn: Callable, items: Iterable) -> List:
+        """
+        Run fn over items concurrently
+        
+        Args:
+            fn: Callable issuing the LLM request
+            items: Arguments, one call per item
+            
+        Returns:
+            Results in the same order as items
+        """
+        futures = [self.submit(fn, item) for item in items]
+        logging.info(f"Dispatched batch of {len(futures)} requests")
+        return [future.result() for future in futures]
+    
+    def shutdown(self):
+        """Stop accepting work and wait for in-flight requests"""
+        self._executor.shutdown(wait=True)
\ No newline at end of file
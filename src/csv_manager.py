@@ -1,12 +1,44 @@
 """
 CSV Manager - Handle application tracking CSV operations
 """
+import csv
 import logging
+import os
+import stat
+import tempfile
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
 from typing import Optional, Dict, List
 
+try:
+    import fcntl
+except ImportError:  # Windows: appends are not locked
+    fcntl = None
+
+# Same strings pandas.read_csv treats as missing by default
+_NULL_VALUES = [
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND',
+    '1.#QNAN', '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null'
+]
+_NULL_SET = frozenset(_NULL_VALUES)
+
+
+def _to_number(value: str):
+    """Convert a numeric CSV cell to int/float, leaving other text unchanged"""
+    try:
+        return int(value)
+    except ValueError:
+        try:
+            return float(value)
+        except ValueError:
+            return value
+
 
 class CSVManager:
     """Manager for CSV-based application tracking"""
@@ -28,6 +60,29 @@ class CSVManager:
             'job_description_summary',
             'notes'
         ]
+        # Free-text columns are read as strings so the reader skips type inference
+        # (and a company like "3M" or "1800" never turns into a number)
+        self.dtypes = {
+            'company': pa.string(),
+            'date': pa.string(),
+            'resume_created': pa.string(),
+            'changes_required': pa.string(),
+            'job_description_summary': pa.string(),
+            'notes': pa.string()
+        }
+        
+        # LLM feedback spans several lines, so quoted values may contain newlines
+        self._parse_options = pa_csv.ParseOptions(newlines_in_values=True)
+        self._convert_options = pa_csv.ConvertOptions(
+            column_types=self.dtypes,
+            null_values=_NULL_VALUES,
+            strings_can_be_null=True
+        )
+        
+        # Parsed DataFrame keyed on the file's (mtime_ns, size)
+        self._cache = None
+        self._company_keys = None
+        self._statistics = None
         
         self._initialize_csv()
         logging.info(f"CSV Manager initialized with file: {csv_path}")
@@ -51,6 +106,101 @@ class CSVManager:
         except Exception as e:
             logging.error(f"Error initializing CSV: {str(e)}")
     
+    def _read_csv(self) -> pd.DataFrame:
+        """
+        Read the applications CSV with explicit column types
+        
+        The parsed DataFrame is reused until the file changes on disk, so
+        callers that modify it must work on a copy or replace whole columns.
+        """
+        file_stat = os.stat(self.csv_path)
+        key = (file_stat.st_mtime_ns, file_stat.st_size)
+        cache = self._cache
+        if cache is not None and cache[0] == key:
+            return cache[1]
+        
+        if file_stat.st_size == 0:
+            raise pd.errors.EmptyDataError("No columns to parse from file")
+        
+        # Arrow's multi-threaded reader, converted to the usual pandas dtypes
+        table = pa_csv.read_csv(
+            self.csv_path,
+            parse_options=self._parse_options,
+            convert_options=self._convert_options
+        )
+        # Arrow yields None for missing strings; keep pandas' NaN convention
+        df = table.to_pandas()
+        for column in df.columns.intersection(list(self.dtypes)):
+            values = df[column].to_numpy(dtype=object, copy=True)
+            values[pd.isna(values)] = np.nan
+            df[column] = values
+        self._cache = (key, df)
+        return df
+    
+    @contextmanager
+    def _locked(self):
+        """Hold an exclusive lock on the CSV file while it is modified (POSIX only)"""
+        while True:
+            file = open(self.csv_path, 'a', newline='', encoding='utf-8')
+            if fcntl is None:
+                break
+            fcntl.flock(file, fcntl.LOCK_EX)
+            
+            # A rewrite may have replaced the file while we were waiting
+            try:
+                if os.fstat(file.fileno()).st_ino == os.stat(self.csv_path).st_ino:
+                    break
+            except FileNotFoundError:
+                pass
+            file.close()
+        
+        try:
+            yield file
+        finally:
+            # Closing the file releases the lock
+            file.close()
+    
+    def _append_row(self, row: List):
+        """Append one row to the CSV, writing the header if the file is new or empty"""
+        with self._locked() as file:
+            writer = csv.writer(file, lineterminator=os.linesep)
+            size = os.fstat(file.fileno()).st_size
+            if size == 0:
+                writer.writerow(self.columns)
+            else:
+                # Hand-edited files may lack a final newline
+                with open(self.csv_path, 'rb') as existing:
+                    existing.seek(size - 1)
+                    if existing.read(1) not in (b'\n', b'\r'):
+                        file.write(os.linesep)
+            writer.writerow(row)
+    
+    def _write_csv(self, df: pd.DataFrame):
+        """Replace the CSV atomically so readers never see a partially written file"""
+        csv_file = Path(self.csv_path)
+        fd, tmp_path = tempfile.mkstemp(dir=csv_file.parent, prefix=f".{csv_file.name}.", suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', newline='', encoding='utf-8') as file:
+                df.to_csv(file, index=False)
+            os.chmod(tmp_path, stat.S_IMODE(os.stat(self.csv_path).st_mode))
+            os.replace(tmp_path, self.csv_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        finally:
+            self._cache = None
+    
+    def _lowercase_companies(self, df: pd.DataFrame) -> pa.Array:
+        """Lowercased company column as an Arrow array, cached per parsed DataFrame"""
+        cached = self._company_keys
+        if cached is not None and cached[0] is df:
+            return cached[1]
+        
+        companies = pc.cast(pa.array(df['company'], from_pandas=True), pa.string())
+        keys = pc.utf8_lower(companies)
+        self._company_keys = (df, keys)
+        return keys
+    
     def add_entry(
         self,
         company: str,
@@ -75,28 +225,20 @@ class CSVManager:
             True if successful, False otherwise
         """
         try:
-            # Create entry dict
-            entry = {
-                'company': company,
-                'date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                'resume_created': 'Yes' if resume_created else 'No',
-                'ats_score': ats_score if ats_score is not None else 'N/A',
-                'changes_required': changes_required or 'None specified',
-                'job_description_summary': job_description_summary or 'N/A',
-                'notes': notes or ''
-            }
-            
-            # Read existing CSV
-            try:
-                df = pd.read_csv(self.csv_path)
-            except pd.errors.EmptyDataError:
-                df = pd.DataFrame(columns=self.columns)
-            
-            # Append new entry
-            df = pd.concat([df, pd.DataFrame([entry])], ignore_index=True)
-            
-            # Save to CSV
-            df.to_csv(self.csv_path, index=False)
+            # Create the row already formatted, in self.columns order
+            row = [
+                company,
+                datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'Yes' if resume_created else 'No',
+                str(ats_score) if ats_score is not None else 'N/A',
+                changes_required or 'None specified',
+                job_description_summary or 'N/A',
+                notes or ''
+            ]
+            
+            # Append the row without rereading the file
+            self._append_row(row)
+            self._cache = None
             
             logging.info(f"Added entry for company: {company}")
             return True
@@ -113,7 +255,7 @@ class CSVManager:
             DataFrame with all entries or None if error
         """
         try:
-            df = pd.read_csv(self.csv_path)
+            df = self._read_csv().copy()
             logging.info(f"Retrieved {len(df)} entries from CSV")
             return df
             
@@ -135,8 +277,9 @@ class CSVManager:
             DataFrame with matching entries or None if error
         """
         try:
-            df = pd.read_csv(self.csv_path)
-            filtered = df[df['company'].str.lower() == company.lower()]
+            df = self._read_csv()
+            matches = pc.equal(self._lowercase_companies(df), company.lower())
+            filtered = df[pc.fill_null(matches, False).to_numpy(zero_copy_only=False)]
             
             logging.info(f"Found {len(filtered)} entries for company: {company}")
             return filtered
@@ -156,13 +299,13 @@ class CSVManager:
             DataFrame with recent entries or None if error
         """
         try:
-            df = pd.read_csv(self.csv_path)
+            df = self._read_csv()
             
-            # Sort by date descending
-            df['date'] = pd.to_datetime(df['date'])
-            df_sorted = df.sort_values('date', ascending=False)
-            
-            recent = df_sorted.head(n)
+            # Dates are written as "YYYY-MM-DD HH:MM:SS", so take the ISO 8601 fast path
+            # instead of guessing the format. Top n dates without sorting the whole
+            # column; on equal timestamps the later row (appended last) comes first
+            dates = pd.to_datetime(df['date'], format='ISO8601').iloc[::-1].nlargest(n)
+            recent = df.loc[dates.index].assign(date=dates)
             logging.info(f"Retrieved {len(recent)} recent entries")
             return recent
             
@@ -178,43 +321,54 @@ class CSVManager:
             Dict with statistics or None if error
         """
         try:
-            df = pd.read_csv(self.csv_path)
-            
-            if len(df) == 0:
-                return {
-                    'total_applications': 0,
-                    'resumes_created': 0,
-                    'average_score': 0,
-                    'highest_score': 0,
-                    'lowest_score': 0,
-                    'companies': []
-                }
+            df = self._read_csv()
             
-            # Calculate statistics
-            stats = {
-                'total_applications': len(df),
-                'resumes_created': len(df[df['resume_created'] == 'Yes']),
-                'companies': df['company'].unique().tolist()
-            }
-            
-            # Score statistics (only for numeric scores)
-            scores = pd.to_numeric(df['ats_score'], errors='coerce').dropna()
-            if len(scores) > 0:
-                stats['average_score'] = round(scores.mean(), 2)
-                stats['highest_score'] = int(scores.max())
-                stats['lowest_score'] = int(scores.min())
-            else:
-                stats['average_score'] = 0
-                stats['highest_score'] = 0
-                stats['lowest_score'] = 0
+            # Reuse the statistics computed for this version of the file
+            cached = self._statistics
+            if cached is None or cached[0] is not df:
+                cached = self._statistics = (df, self._compute_statistics(df))
             
-            logging.info("Generated application statistics")
-            return stats
+            stats = cached[1]
+            return dict(stats, companies=list(stats['companies']))
             
         except Exception as e:
             logging.error(f"Error calculating statistics: {str(e)}")
             return None
     
+    def _compute_statistics(self, df: pd.DataFrame) -> Dict:
+        """Aggregate statistics over the parsed applications DataFrame"""
+        if len(df) == 0:
+            return {
+                'total_applications': 0,
+                'resumes_created': 0,
+                'average_score': 0,
+                'highest_score': 0,
+                'lowest_score': 0,
+                'companies': []
+            }
+        
+        # Calculate statistics on the underlying arrays (no filtered frames)
+        stats = {
+            'total_applications': len(df),
+            'resumes_created': int((df['resume_created'].to_numpy() == 'Yes').sum()),
+            'companies': df['company'].unique().tolist()
+        }
+        
+        # Score statistics (only for numeric scores)
+        scores = pd.to_numeric(df['ats_score'], errors='coerce').to_numpy(dtype=float)
+        scores = scores[~np.isnan(scores)]
+        if scores.size > 0:
+            stats['average_score'] = round(float(scores.mean()), 2)
+            stats['highest_score'] = int(scores.max())
+            stats['lowest_score'] = int(scores.min())
+        else:
+            stats['average_score'] = 0
+            stats['highest_score'] = 0
+            stats['lowest_score'] = 0
+        
+        logging.info("Generated application statistics")
+        return stats
+    
     def update_entry(
         self,
         company: str,
@@ -233,22 +387,23 @@ class CSVManager:
             True if successful, False otherwise
         """
         try:
-            df = pd.read_csv(self.csv_path)
-            
-            # Find matching entry
-            mask = (df['company'] == company) & (df['date'] == date)
-            
-            if not mask.any():
-                logging.warning(f"No entry found for {company} on {date}")
-                return False
-            
-            # Update fields
-            for key, value in updates.items():
-                if key in df.columns:
-                    df.loc[mask, key] = value
-            
-            # Save
-            df.to_csv(self.csv_path, index=False)
+            with self._locked():
+                df = self._read_csv().copy(deep=False)
+                
+                # Find matching entry
+                mask = (df['company'] == company) & (df['date'] == date)
+                
+                if not mask.any():
+                    logging.warning(f"No entry found for {company} on {date}")
+                    return False
+                
+                # Update fields; assigning whole new columns leaves the cached frame untouched
+                for key, value in updates.items():
+                    if key in df.columns:
+                        df[key] = df[key].where(~mask, value)
+                
+                # Save
+                self._write_csv(df)
             
             logging.info(f"Updated entry for {company} on {date}")
             return True
@@ -269,13 +424,14 @@ class CSVManager:
             True if successful, False otherwise
         """
         try:
-            df = pd.read_csv(self.csv_path)
-            
-            # Remove matching entries
-            df = df[~((df['company'] == company) & (df['date'] == date))]
-            
-            # Save
-            df.to_csv(self.csv_path, index=False)
+            with self._locked():
+                df = self._read_csv()
+                
+                # Remove matching entries
+                df = df[~((df['company'] == company) & (df['date'] == date))]
+                
+                # Save
+                self._write_csv(df)
             
             logging.info(f"Deleted entry for {company} on {date}")
             return True
@@ -295,8 +451,27 @@ class CSVManager:
             True if successful, False otherwise
         """
         try:
-            df = pd.read_csv(self.csv_path)
-            df.to_excel(output_path, index=False)
+            from openpyxl import Workbook
+            
+            # Stream rows from the CSV into a write-only workbook (no DataFrame or cell model)
+            workbook = Workbook(write_only=True)
+            sheet = workbook.create_sheet('Sheet1')
+            
+            with open(self.csv_path, newline='', encoding='utf-8') as file:
+                reader = csv.reader(file)
+                header = next(reader, self.columns)
+                sheet.append(header)
+                score_index = header.index('ats_score') if 'ats_score' in header else None
+                
+                for row in reader:
+                    if not row:
+                        continue
+                    cells = [None if value in _NULL_SET else value for value in row]
+                    if score_index is not None and score_index < len(cells) and cells[score_index] is not None:
+                        cells[score_index] = _to_number(cells[score_index])
+                    sheet.append(cells)
+            
+            workbook.save(output_path)
             
             logging.info(f"Exported to Excel: {output_path}")
             return True
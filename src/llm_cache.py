@@ -0,0 +1,283 @@
+"""
+LLM Cache - Persistent exact-match cache for template generations
+"""
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+from src.llm_handler import LLMHandler
+
+
+class _InFlight:
+    """A generation in progress that identical requests can wait on"""
+    
+    __slots__ = ('done', 'response')
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.response = None
+
+
+class CachedLLM:
+    """Wrapper around LLMHandler that caches template generations on disk"""
+    
+    def __init__(
+        self,
+        llm_handler: LLMHandler,
+        cache_dir: str,
+        enabled: bool = True,
+        memory_entries: int = 256
+    ):
+        """
+        Initialize cached LLM wrapper
+        
+        Args:
+            llm_handler: LLM handler instance to delegate to
+            cache_dir: Directory holding the cache database
+            enabled: Whether to serve and store cached responses at all
+            memory_entries: Number of hot responses also kept in memory
+        """
+        self.llm = llm_handler
+        self.db_path = Path(cache_dir) / "llm_cache.sqlite3"
+        self.enabled = enabled
+        self.memory_entries = memory_entries
+        self._memory = OrderedDict()
+        self._memory_lock = threading.Lock()
+        # Counters live in a dict so per-session copies (with_llm) add to the same totals
+        self._counters = {'hits': 0, 'misses': 0, 'coalesced': 0}
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+        
+        self._initialize_db()
+        logging.info(f"LLM cache initialized at: {self.db_path}")
+    
+    def __getattr__(self, name):
+        """Delegate everything not cached (model, generate, ...) to the handler"""
+        return getattr(self.llm, name)
+    
+    def with_llm(self, llm_handler: LLMHandler) -> 'CachedLLM':
+        """
+        Wrap another handler while sharing this cache's memory, in-flight requests and counters
+        
+        Args:
+            llm_handler: LLM handler to delegate to (e.g. one session's model choice)
+            
+        Returns:
+            New CachedLLM instance
+        """
+        cached = object.__new__(CachedLLM)
+        cached.__dict__.update(self.__dict__)
+        cached.llm = llm_handler
+        return cached
+    
+    def _initialize_db(self):
+        """Create cache database and table if they don't exist"""
+        try:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            with self._connect() as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS responses ("
+                    "key TEXT PRIMARY KEY, response TEXT NOT NULL, created REAL NOT NULL)"
+                )
+        except Exception as e:
+            logging.error(f"Error initializing LLM cache: {str(e)}")
+    
+    @contextmanager
+    def _connect(self):
+        """Open a short-lived connection (safe to use across Streamlit threads)"""
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+    
+    def _make_key(self, template: Dict, kwargs: Dict) -> str:
+        """Build the cache key from model, sampling settings, template and template arguments"""
+        raw = (
+            f"{self.llm.model}\0{self.llm.temperature}\0{self.llm.max_tokens}\0"
+            f"{template.get('system', '')}\0{template['user']}\0"
+            + "\0".join(f"{k}={v}" for k, v in sorted(kwargs.items()))
+        )
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+    
+    def _remember(self, key: str, response: str):
+        """Keep a response in the in-memory LRU"""
+        with self._memory_lock:
+            self._memory[key] = response
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+    
+    def _get(self, key: str) -> Optional[str]:
+        """Look up a cached response, in memory first and then on disk"""
+        with self._memory_lock:
+            response = self._memory.get(key)
+            if response is not None:
+                self._memory.move_to_end(key)
+                return response
+        
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT response FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+            if row:
+                self._remember(key, row[0])
+            return row[0] if row else None
+        except Exception as e:
+            logging.error(f"Error reading LLM cache: {str(e)}")
+            return None
+    
+    def _set(self, key: str, response: str):
+        """Store a response in the cache"""
+        self._remember(key, response)
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, response, created) VALUES (?, ?, ?)",
+                    (key, response, time.time())
+                )
+        except Exception as e:
+            logging.error(f"Error writing LLM cache: {str(e)}")
+    
+    def generate_with_template(
+        self,
+        template: Dict,
+        refresh: bool = False,
+        **kwargs
+    ) -> Optional[str]:
+        """
+        Generate response using a prompt template, served from cache when possible
+        
+        Args:
+            template: Dict with 'system' and 'user' keys
+            refresh: Skip the cached response and store a newly generated one
+            **kwargs: Variables to format into the template
+            
+        Returns:
+            Generated text or None if error
+        """
+        if not self.enabled:
+            return self.llm.generate_with_template(template, **kwargs)
+        
+        try:
+            key = self._make_key(template, kwargs)
+        except Exception as e:
+            logging.error(f"Error building LLM cache key: {str(e)}")
+            return self.llm.generate_with_template(template, **kwargs)
+        
+        if refresh:
+            self._counters['misses'] += 1
+            logging.info("Bypassing LLM cache for a fresh generation")
+            response = self.llm.generate_with_template(template, **kwargs)
+            if response:
+                self._set(key, response)
+            return response
+        
+        cached = self._get(key)
+        if cached is not None:
+            self._counters['hits'] += 1
+            logging.info("LLM cache hit")
+            return cached
+        
+        # Identical requests already running (e.g. after a Streamlit rerun) share one call
+        with self._inflight_lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _InFlight()
+        
+        if not leader:
+            flight.done.wait()
+            self._counters['coalesced'] += 1
+            logging.info("Joined in-flight LLM request")
+            return flight.response
+        
+        response = None
+        try:
+            # The previous leader may have finished between the lookup and registration
+            response = self._get(key)
+            if response is not None:
+                self._counters['hits'] += 1
+                return response
+            
+            self._counters['misses'] += 1
+            response = self.llm.generate_with_template(template, **kwargs)
+            if response:
+                self._set(key, response)
+            return response
+        finally:
+            flight.response = response
+            with self._inflight_lock:
+                del self._inflight[key]
+            flight.done.set()
+    
+    def stream_with_template(self, template: Dict, **kwargs) -> Iterator[Optional[str]]:
+        """
+        Stream response using a prompt template, served from cache when possible
+        
+        Args:
+            template: Dict with 'system' and 'user' keys
+            **kwargs: Variables to format into the template
+            
+        Yields:
+            Text chunks as they're generated (None if error)
+        """
+        if not self.enabled:
+            yield from self.llm.stream_with_template(template, **kwargs)
+            return
+        
+        try:
+            key = self._make_key(template, kwargs)
+        except Exception as e:
+            logging.error(f"Error building LLM cache key: {str(e)}")
+            yield from self.llm.stream_with_template(template, **kwargs)
+            return
+        
+        cached = self._get(key)
+        if cached is not None:
+            self._counters['hits'] += 1
+            logging.info("LLM cache hit")
+            yield cached
+            return
+        
+        self._counters['misses'] += 1
+        chunks = []
+        for chunk in self.llm.stream_with_template(template, **kwargs):
+            if chunk is None:
+                yield None
+                return
+            chunks.append(chunk)
+            yield chunk
+        
+        if chunks:
+            self._set(key, ''.join(chunks))
+    
+    def get_stats(self, include_entries: bool = False) -> Dict[str, int]:
+        """
+        Get cache hit/miss counters
+        
+        Args:
+            include_entries: Also count the stored responses (queries the database)
+            
+        Returns:
+            Dict with hits, misses, coalesced duplicates and, if requested, the
+            stored entry count
+        """
+        stats = dict(self._counters)
+        
+        if include_entries:
+            stats['entries'] = 0
+            try:
+                with self._connect() as conn:
+                    stats['entries'] = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            except Exception as e:
+                logging.error(f"Error reading LLM cache stats: {str(e)}")
+        
+        return stats
\ No newline at end of file
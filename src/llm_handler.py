@@ -1,10 +1,13 @@
 """
 LLM Handler for Ollama integration
 """
+import copy
 import logging
+import orjson
 import requests
-import json
-from typing import Dict, Optional
+from requests.adapters import HTTPAdapter
+from typing import Dict, Iterator, Optional
+from src.utils import render_template
 
 
 class LLMHandler:
@@ -17,13 +20,84 @@ class LLMHandler:
         self.timeout = config['ollama']['timeout']
         self.temperature = config['ollama']['temperature']
         self.max_tokens = config['ollama']['max_tokens']
+        self.quantization = config['ollama'].get('quantization', '')
+        self.keep_alive = config['ollama'].get('keep_alive', '')
+        self._prefix_cache = None
+        
+        # Reuse keep-alive connections to Ollama instead of reconnecting per request
+        pool_size = max(4, config['ollama'].get('num_parallel', 4) * 2)
+        self.session = requests.Session()
+        self.session.mount('http://', HTTPAdapter(pool_connections=4, pool_maxsize=pool_size))
+        self.session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=pool_size))
+        # Request bodies are pre-encoded with orjson
+        self.session.headers['Content-Type'] = 'application/json'
         
         logging.info(f"LLM Handler initialized with model: {self.model}")
     
+    def close(self):
+        """Close pooled connections to Ollama"""
+        self.session.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def with_settings(self, **settings) -> 'LLMHandler':
+        """
+        Copy of this handler with some settings replaced (e.g. one session's model)
+        
+        The copy shares the connection pool but leaves this handler untouched, so
+        a handler shared between Streamlit sessions never picks up one user's choice.
+        
+        Args:
+            **settings: Attributes to override (model, keep_alive, ...)
+            
+        Returns:
+            New LLMHandler instance
+        """
+        handler = copy.copy(self)
+        handler.__dict__.update(settings)
+        handler._prefix_cache = None
+        return handler
+    
+    def _options(self) -> Dict:
+        """Build the generation options sent with every request"""
+        return {
+            "temperature": self.temperature,
+            "num_predict": self.max_tokens
+        }
+    
+    def _generate_prefix(self) -> bytes:
+        """
+        Encoded /api/generate body up to the prompt, rebuilt only when settings change
+        
+        Model, options and keep_alive are the same for every request a handler
+        makes (sessions switch models through with_settings), so they are
+        serialized once.
+        """
+        settings = (self.model, self.temperature, self.max_tokens, self.keep_alive)
+        cached = self._prefix_cache
+        if cached is not None and cached[0] == settings:
+            return cached[1]
+        
+        payload = {
+            "model": self.model,
+            "stream": True,
+            "options": self._options()
+        }
+        if self.keep_alive:
+            payload["keep_alive"] = self.keep_alive
+        
+        prefix = orjson.dumps(payload)[:-1] + b',"prompt":'
+        self._prefix_cache = (settings, prefix)
+        return prefix
+    
     def check_connection(self) -> bool:
         """Check if Ollama is running and accessible"""
         try:
-            response = requests.get(f"{self.base_url}/api/tags", timeout=5)
+            response = self.session.get(f"{self.base_url}/api/tags", timeout=5)
             if response.status_code == 200:
                 logging.info("Successfully connected to Ollama")
                 return True
@@ -40,9 +114,9 @@ class LLMHandler:
     def list_models(self) -> list:
         """List available models in Ollama"""
         try:
-            response = requests.get(f"{self.base_url}/api/tags", timeout=5)
+            response = self.session.get(f"{self.base_url}/api/tags", timeout=5)
             if response.status_code == 200:
-                data = response.json()
+                data = orjson.loads(response.content)
                 models = [model['name'] for model in data.get('models', [])]
                 logging.info(f"Available models: {models}")
                 return models
@@ -51,6 +125,151 @@ class LLMHandler:
             logging.error(f"Error listing models: {str(e)}")
             return []
     
+    def preferred_model(self, available_models: list, model: Optional[str] = None) -> str:
+        """
+        Pick a model, preferring its quantized variant when one is installed
+        
+        Args:
+            available_models: Installed model names
+            model: Model to resolve (defaults to the current model)
+            
+        Returns:
+            Name of the quantized variant if available, otherwise the model itself
+        """
+        model = model or self.model
+        if not self.quantization:
+            return model
+        
+        base, _, tag = model.partition(':')
+        tag = '' if tag == 'latest' else tag
+        suffix = self.quantization.lower()
+        
+        for name in available_models:
+            name_base, _, name_tag = name.partition(':')
+            if name_base == base and name_tag.startswith(tag) and name_tag.lower().endswith(suffix):
+                logging.info(f"Using quantized model variant: {name}")
+                return name
+        
+        return model
+    
+    def quantized_model_name(self, model: Optional[str] = None) -> str:
+        """Build the Ollama tag for the quantized variant of a model"""
+        base, _, tag = (model or self.model).partition(':')
+        tag = '' if tag == 'latest' else tag
+        return f"{base}:{tag + '-' if tag else ''}{self.quantization}"
+    
+    def pull_model(self, model: str) -> bool:
+        """
+        Download a model into Ollama
+        
+        Args:
+            model: Model name with tag
+            
+        Returns:
+            True if successful, False otherwise
+        """
+        try:
+            logging.info(f"Pulling model: {model}")
+            response = self.session.post(
+                f"{self.base_url}/api/pull",
+                data=orjson.dumps({"name": model, "stream": False}),
+                timeout=None
+            )
+            if response.status_code == 200:
+                logging.info(f"Model pulled successfully: {model}")
+                return True
+            else:
+                logging.error(f"Ollama pull error: {response.status_code} - {response.text}")
+                return False
+        except Exception as e:
+            logging.error(f"Error pulling model: {str(e)}")
+            return False
+    
+    def warm_up(self) -> bool:
+        """
+        Load the current model into memory with an empty generation
+        
+        Returns:
+            True if the model is loaded, False otherwise
+        """
+        try:
+            payload = {"model": self.model, "prompt": "", "stream": False}
+            if self.keep_alive:
+                payload["keep_alive"] = self.keep_alive
+            
+            logging.info(f"Warming up model: {self.model}")
+            response = self.session.post(
+                f"{self.base_url}/api/generate",
+                data=orjson.dumps(payload),
+                timeout=self.timeout
+            )
+            
+            if response.status_code == 200:
+                logging.info(f"Model warmed up: {self.model}")
+                return True
+            else:
+                logging.error(f"Error warming up model: {response.status_code} - {response.text}")
+                return False
+                
+        except Exception as e:
+            logging.error(f"Error warming up model: {str(e)}")
+            return False
+    
+    def _generate_chunks(self, prompt: str, system_prompt: Optional[str] = None) -> Iterator[str]:
+        """
+        Stream a generation from Ollama, raising on errors and incomplete streams
+        
+        Args:
+            prompt: User prompt
+            system_prompt: Optional system prompt
+            
+        Yields:
+            Text chunks as they're generated
+        """
+        url = f"{self.base_url}/api/generate"
+        
+        # Splice the per-request fields onto the pre-encoded settings
+        parts = [self._generate_prefix(), orjson.dumps(prompt)]
+        if system_prompt:
+            parts += (b',"system":', orjson.dumps(system_prompt))
+        parts.append(b'}')
+        
+        # Closing the response returns the connection to the pool even if
+        # the consumer stops iterating early
+        with self.session.post(
+            url,
+            data=b''.join(parts),
+            stream=True,
+            timeout=self.timeout
+        ) as response:
+            if response.status_code != 200:
+                raise requests.exceptions.HTTPError(
+                    f"{response.status_code} - {response.text}", response=response
+                )
+            
+            for line in response.iter_lines():
+                if line:
+                    try:
+                        data = orjson.loads(line)
+                    except orjson.JSONDecodeError:
+                        continue
+                    
+                    # Ollama reports failures mid-stream (e.g. out of memory) as an error line
+                    if 'error' in data:
+                        raise requests.exceptions.HTTPError(
+                            f"Ollama error: {data['error']}", response=response
+                        )
+                    chunk = data.get('response', '')
+                    if chunk:
+                        yield chunk
+                    if data.get('done'):
+                        return
+            
+            # A stream cut off before the final done line carries a partial answer
+            raise requests.exceptions.ChunkedEncodingError(
+                "Ollama stream ended before the generation completed"
+            )
+    
     def generate(self, prompt: str, system_prompt: Optional[str] = None) -> Optional[str]:
         """
         Generate response from LLM
@@ -63,40 +282,18 @@ class LLMHandler:
             Generated text or None if error
         """
         try:
-            url = f"{self.base_url}/api/generate"
-            
-            payload = {
-                "model": self.model,
-                "prompt": prompt,
-                "stream": False,
-                "options": {
-                    "temperature": self.temperature,
-                    "num_predict": self.max_tokens
-                }
-            }
-            
-            if system_prompt:
-                payload["system"] = system_prompt
-            
             logging.info(f"Sending request to Ollama with model: {self.model}")
             logging.debug(f"Prompt length: {len(prompt)} characters")
             
-            response = requests.post(
-                url,
-                json=payload,
-                timeout=self.timeout
-            )
+            # Collect the streamed fragments rather than buffering one large JSON body
+            generated_text = ''.join(self._generate_chunks(prompt, system_prompt))
+            logging.info("Successfully generated response from LLM")
+            logging.debug(f"Response length: {len(generated_text)} characters")
+            return generated_text
             
-            if response.status_code == 200:
-                result = response.json()
-                generated_text = result.get('response', '')
-                logging.info("Successfully generated response from LLM")
-                logging.debug(f"Response length: {len(generated_text)} characters")
-                return generated_text
-            else:
-                logging.error(f"Ollama API error: {response.status_code} - {response.text}")
-                return None
-                
+        except requests.exceptions.HTTPError as e:
+            logging.error(f"Ollama API error: {str(e)}")
+            return None
         except requests.exceptions.Timeout:
             logging.error("Request to Ollama timed out")
             return None
@@ -124,22 +321,22 @@ class LLMHandler:
                 "model": self.model,
                 "messages": messages,
                 "stream": False,
-                "options": {
-                    "temperature": self.temperature,
-                    "num_predict": self.max_tokens
-                }
+                "options": self._options()
             }
             
+            if self.keep_alive:
+                payload["keep_alive"] = self.keep_alive
+            
             logging.info(f"Sending chat request to Ollama")
             
-            response = requests.post(
+            response = self.session.post(
                 url,
-                json=payload,
+                data=orjson.dumps(payload),
                 timeout=self.timeout
             )
             
             if response.status_code == 200:
-                result = response.json()
+                result = orjson.loads(response.content)
                 generated_text = result.get('message', {}).get('content', '')
                 logging.info("Successfully generated chat response")
                 return generated_text
@@ -164,7 +361,7 @@ class LLMHandler:
         """
         try:
             system_prompt = template.get('system', '')
-            user_prompt = template['user'].format(**kwargs)
+            user_prompt = render_template(template['user'], **kwargs)
             
             return self.generate(user_prompt, system_prompt)
             
@@ -175,6 +372,31 @@ class LLMHandler:
             logging.error(f"Error generating with template: {str(e)}")
             return None
     
+    def stream_with_template(self, template: Dict, **kwargs) -> Iterator[Optional[str]]:
+        """
+        Generate response with streaming using a prompt template
+        
+        Args:
+            template: Dict with 'system' and 'user' keys
+            **kwargs: Variables to format into the template
+            
+        Yields:
+            Text chunks as they're generated (None if error)
+        """
+        try:
+            system_prompt = template.get('system', '')
+            user_prompt = render_template(template['user'], **kwargs)
+        except KeyError as e:
+            logging.error(f"Missing template variable: {str(e)}")
+            yield None
+            return
+        except Exception as e:
+            logging.error(f"Error streaming with template: {str(e)}")
+            yield None
+            return
+        
+        yield from self.stream_generate(user_prompt, system_prompt)
+    
     def stream_generate(self, prompt: str, system_prompt: Optional[str] = None):
         """
         Generate response with streaming (yields chunks)
@@ -187,44 +409,12 @@ class LLMHandler:
             Text chunks as they're generated
         """
         try:
-            url = f"{self.base_url}/api/generate"
-            
-            payload = {
-                "model": self.model,
-                "prompt": prompt,
-                "stream": True,
-                "options": {
-                    "temperature": self.temperature,
-                    "num_predict": self.max_tokens
-                }
-            }
-            
-            if system_prompt:
-                payload["system"] = system_prompt
-            
             logging.info("Starting streaming generation")
+            yield from self._generate_chunks(prompt, system_prompt)
             
-            response = requests.post(
-                url,
-                json=payload,
-                stream=True,
-                timeout=self.timeout
-            )
-            
-            if response.status_code == 200:
-                for line in response.iter_lines():
-                    if line:
-                        try:
-                            data = json.loads(line)
-                            chunk = data.get('response', '')
-                            if chunk:
-                                yield chunk
-                        except json.JSONDecodeError:
-                            continue
-            else:
-                logging.error(f"Streaming error: {response.status_code}")
-                yield None
-                
+        except requests.exceptions.HTTPError as e:
+            logging.error(f"Streaming error: {str(e)}")
+            yield None
         except Exception as e:
             logging.error(f"Error in streaming generation: {str(e)}")
             yield None
\ No newline at end of file
@@ -1,31 +1,75 @@
 """
 Resume Generator - Create tailored resumes based on job descriptions
 """
+import asyncio
+import copy
 import logging
 from typing import Dict, Optional
 from src.llm_handler import LLMHandler
+from src.llm_cache import CachedLLM
+from src.utils import compile_template
 
 
 class ResumeGenerator:
     """Generator for creating tailored resumes"""
     
-    def __init__(self, llm_handler: LLMHandler, prompts: Dict):
+    def __init__(self, llm_handler: LLMHandler, prompts: Dict, config: Optional[Dict] = None):
         """
         Initialize Resume Generator
         
         Args:
             llm_handler: LLM handler instance
             prompts: Prompt templates
+            config: Optional configuration dict; enables the response cache
         """
-        self.llm = llm_handler
+        if config is not None:
+            cache_config = config.get('cache', {})
+            self.llm = CachedLLM(
+                llm_handler,
+                config['paths'].get('cache_dir', 'data/cache'),
+                enabled=cache_config.get('enabled', True),
+                memory_entries=cache_config.get('memory_entries', 256)
+            )
+        else:
+            self.llm = llm_handler
         self.prompts = prompts
+        
+        # Parse the user templates once; rendering reuses the compiled form
+        for template in prompts.values():
+            if isinstance(template, dict) and isinstance(template.get('user'), str):
+                compile_template(template['user'])
+        
         logging.info("Resume Generator initialized")
     
+    def with_llm(self, llm_handler: LLMHandler) -> 'ResumeGenerator':
+        """
+        Copy of this generator that generates with another handler (cache stays shared)
+        
+        Args:
+            llm_handler: LLM handler to generate with
+            
+        Returns:
+            New ResumeGenerator instance
+        """
+        generator = copy.copy(self)
+        if isinstance(self.llm, CachedLLM):
+            generator.llm = self.llm.with_llm(llm_handler)
+        else:
+            generator.llm = llm_handler
+        return generator
+    
+    def _generate(self, template: Dict, regenerate: bool = False, **kwargs) -> Optional[str]:
+        """Generate with a template; regenerate skips the cached response for a new draft"""
+        if regenerate and isinstance(self.llm, CachedLLM):
+            return self.llm.generate_with_template(template, refresh=True, **kwargs)
+        return self.llm.generate_with_template(template, **kwargs)
+    
     def generate_tailored_resume(
         self,
         base_resume: str,
         job_description: str,
-        background: Optional[str] = None
+        background: Optional[str] = None,
+        regenerate: bool = False
     ) -> Optional[str]:
         """
         Generate a tailored resume based on base resume and JD
@@ -34,6 +78,7 @@ class ResumeGenerator:
             base_resume: Base/master resume content
             job_description: Target job description
             background: Optional candidate background for context
+            regenerate: Ask the model for a new draft instead of the cached one
             
         Returns:
             Generated tailored resume or None if error
@@ -57,8 +102,9 @@ class ResumeGenerator:
                     logging.warning("Background template not found, using standard")
                     template = self.prompts.get('resume_generation')
                 
-                generated_resume = self.llm.generate_with_template(
+                generated_resume = self._generate(
                     template,
+                    regenerate,
                     base_resume=base_resume,
                     job_description=job_description,
                     background=background
@@ -69,8 +115,9 @@ class ResumeGenerator:
                     logging.error("Resume generation template not found")
                     return None
                 
-                generated_resume = self.llm.generate_with_template(
+                generated_resume = self._generate(
                     template,
+                    regenerate,
                     base_resume=base_resume,
                     job_description=job_description
                 )
@@ -216,6 +263,41 @@ class ResumeGenerator:
             logging.error(f"Error optimizing for ATS: {str(e)}")
             return None
     
+    async def analyze_all(
+        self,
+        base_resume: str,
+        job_description: str,
+        background: Optional[str] = None
+    ) -> Dict[str, Optional[str]]:
+        """
+        Generate the tailored resume, gap analysis, suggestions and ATS tips concurrently
+        
+        Args:
+            base_resume: Base/master resume content
+            job_description: Target job description
+            background: Optional candidate background for context
+            
+        Returns:
+            Dict with resume, missing_qualifications, suggestions and ats_optimization
+        """
+        logging.info("Starting concurrent resume generation and analysis")
+        
+        resume, missing, suggestions, optimization = await asyncio.gather(
+            asyncio.to_thread(
+                self.generate_tailored_resume, base_resume, job_description, background
+            ),
+            asyncio.to_thread(self.identify_missing_qualifications, base_resume, job_description),
+            asyncio.to_thread(self.suggest_improvements, base_resume, job_description, background),
+            asyncio.to_thread(self.optimize_for_ats, base_resume)
+        )
+        
+        return {
+            'resume': resume,
+            'missing_qualifications': missing,
+            'suggestions': suggestions,
+            'ats_optimization': optimization
+        }
+    
     def format_resume(self, resume_text: str) -> str:
         """
         Basic formatting cleanup for resume text
@@ -263,11 +345,19 @@ class ResumeGenerator:
             Validation results dict
         """
         try:
+            length = len(generated_resume)
+            
+            # Only copy the text for strip() when it actually has surrounding whitespace
+            if generated_resume[:1].isspace() or generated_resume[-1:].isspace():
+                content_length = len(generated_resume.strip())
+            else:
+                content_length = length
+            
             validation = {
                 'is_valid': True,
-                'has_content': len(generated_resume.strip()) > 100,
+                'has_content': content_length > 100,
                 'is_different': generated_resume != base_resume,
-                'length_reasonable': 500 < len(generated_resume) < 10000,
+                'length_reasonable': 500 < length < 10000,
                 'issues': []
             }
             
@@ -2,10 +2,40 @@
 Resume Parser - Extract text from PDF, Word, and text files
 """
 import logging
+import os
+import re
+import stat
 from io import BytesIO
+from pathlib import Path
 from typing import Optional
-import PyPDF2
-from docx import Document
+
+try:
+    import ahocorasick
+except ImportError:  # Optional: fall back to one substring search per keyword
+    ahocorasick = None
+
+_MULTISPACE_RE = re.compile(r' +')
+
+# Section flags and the keywords that signal them (matched on lowercased text)
+_SECTION_KEYWORDS = (
+    ('has_contact', ('email', 'phone', '@', 'linkedin')),
+    ('has_experience', ('experience', 'work history', 'employment')),
+    ('has_education', ('education', 'degree', 'university', 'college')),
+    ('has_skills', ('skills', 'technologies', 'proficient'))
+)
+
+
+def _build_section_automaton():
+    """Build an Aho-Corasick automaton mapping every section keyword to its flag"""
+    automaton = ahocorasick.Automaton()
+    for flag, keywords in _SECTION_KEYWORDS:
+        for keyword in keywords:
+            automaton.add_word(keyword, flag)
+    automaton.make_automaton()
+    return automaton
+
+
+_SECTION_AUTOMATON = _build_section_automaton() if ahocorasick is not None else None
 
 
 class ResumeParser:
@@ -45,18 +75,16 @@ class ResumeParser:
     def _parse_pdf(self, file_obj) -> Optional[str]:
         """Extract text from PDF file"""
         try:
-            # Create a PDF reader object
-            pdf_reader = PyPDF2.PdfReader(file_obj)
-            
-            # Extract text from all pages
-            text = ""
-            for page_num in range(len(pdf_reader.pages)):
-                page = pdf_reader.pages[page_num]
-                text += page.extract_text()
+            try:
+                text = self._extract_pdf_pymupdf(file_obj)
+            except ImportError:
+                # PyMuPDF not installed; fall back to the pure-Python reader
+                text = self._extract_pdf_pypdf2(file_obj)
             
-            if text.strip():
-                logging.info(f"Successfully extracted text from PDF ({len(text)} characters)")
-                return text.strip()
+            text = text.strip()
+            if text:
+                logging.debug(f"Successfully extracted text from PDF ({len(text)} characters)")
+                return text
             else:
                 logging.warning("PDF text extraction resulted in empty text")
                 return None
@@ -65,27 +93,69 @@ class ResumeParser:
             logging.error(f"Error parsing PDF: {str(e)}")
             return None
     
+    def _extract_pdf_pymupdf(self, file_obj) -> str:
+        """Extract text from all PDF pages with PyMuPDF (C-backed, much faster)"""
+        # Imported here so text-only uploads don't load the PDF stack
+        import pymupdf
+        
+        if isinstance(file_obj, (str, Path)):
+            doc = pymupdf.open(file_obj)
+        elif hasattr(file_obj, 'getvalue'):
+            # BytesIO / Streamlit UploadedFile: whole buffer regardless of position
+            doc = pymupdf.open(stream=file_obj.getvalue(), filetype="pdf")
+        elif hasattr(file_obj, 'read'):
+            if hasattr(file_obj, 'seek'):
+                file_obj.seek(0)
+            doc = pymupdf.open(stream=file_obj.read(), filetype="pdf")
+        else:
+            doc = pymupdf.open(stream=file_obj, filetype="pdf")
+        
+        try:
+            return "".join([page.get_text("text") for page in doc])
+        finally:
+            doc.close()
+    
+    def _extract_pdf_pypdf2(self, file_obj) -> str:
+        """Extract text from all PDF pages with PyPDF2"""
+        import PyPDF2
+        
+        if isinstance(file_obj, (bytes, bytearray)):
+            file_obj = BytesIO(file_obj)
+        
+        # Create a PDF reader object
+        pdf_reader = PyPDF2.PdfReader(file_obj)
+        
+        # Extract text from all pages
+        return "".join([page.extract_text() or "" for page in pdf_reader.pages])
+    
     def _parse_docx(self, file_obj) -> Optional[str]:
         """Extract text from Word document"""
         try:
+            from docx import Document
+            
             # Create a Document object
             doc = Document(file_obj)
             
             # Extract text from paragraphs
-            text = ""
+            parts = []
             for paragraph in doc.paragraphs:
-                text += paragraph.text + "\n"
+                parts.append(paragraph.text)
+                parts.append("\n")
             
             # Also extract text from tables
             for table in doc.tables:
                 for row in table.rows:
                     for cell in row.cells:
-                        text += cell.text + " "
-                    text += "\n"
+                        parts.append(cell.text)
+                        parts.append(" ")
+                    parts.append("\n")
+            
+            text = "".join(parts)
             
-            if text.strip():
-                logging.info(f"Successfully extracted text from DOCX ({len(text)} characters)")
-                return text.strip()
+            text = text.strip()
+            if text:
+                logging.debug(f"Successfully extracted text from DOCX ({len(text)} characters)")
+                return text
             else:
                 logging.warning("DOCX text extraction resulted in empty text")
                 return None
@@ -105,9 +175,10 @@ class ResumeParser:
             else:
                 text = str(file_obj)
             
-            if text.strip():
-                logging.info(f"Successfully extracted text from TXT ({len(text)} characters)")
-                return text.strip()
+            text = text.strip()
+            if text:
+                logging.debug(f"Successfully extracted text from TXT ({len(text)} characters)")
+                return text
             else:
                 logging.warning("TXT file is empty")
                 return None
@@ -131,6 +202,8 @@ class ResumeParser:
             # Get file size
             if hasattr(file_obj, 'size'):
                 size_bytes = file_obj.size
+            elif (size_bytes := self._fstat_size(file_obj)) is not None:
+                pass  # Real file: one fstat instead of two seeks
             elif hasattr(file_obj, 'seek') and hasattr(file_obj, 'tell'):
                 current_pos = file_obj.tell()
                 file_obj.seek(0, 2)  # Seek to end
@@ -152,6 +225,15 @@ class ResumeParser:
             logging.error(f"Error validating file size: {str(e)}")
             return True  # Allow if error
     
+    def _fstat_size(self, file_obj) -> Optional[int]:
+        """Size of a regular file behind file_obj, or None if it isn't backed by one"""
+        try:
+            file_stat = os.fstat(file_obj.fileno())
+        except (AttributeError, OSError, ValueError):
+            # No descriptor (e.g. BytesIO raises UnsupportedOperation) or closed file
+            return None
+        return file_stat.st_size if stat.S_ISREG(file_stat.st_mode) else None
+    
     def extract_sections(self, text: str) -> dict:
         """
         Extract common resume sections (basic implementation)
@@ -173,17 +255,23 @@ class ResumeParser:
         text_lower = text.lower()
         
         # Check for common section headers
-        if any(keyword in text_lower for keyword in ['email', 'phone', '@', 'linkedin']):
-            sections['has_contact'] = True
-        
-        if any(keyword in text_lower for keyword in ['experience', 'work history', 'employment']):
-            sections['has_experience'] = True
-        
-        if any(keyword in text_lower for keyword in ['education', 'degree', 'university', 'college']):
-            sections['has_education'] = True
-        
-        if any(keyword in text_lower for keyword in ['skills', 'technologies', 'proficient']):
-            sections['has_skills'] = True
+        if _SECTION_AUTOMATON is not None:
+            # One pass for all keywords, stopping once every section has been seen
+            remaining = len(_SECTION_KEYWORDS)
+            for _, flag in _SECTION_AUTOMATON.iter(text_lower):
+                if not sections[flag]:
+                    sections[flag] = True
+                    remaining -= 1
+                    if not remaining:
+                        break
+        else:
+            # str's substring search beats a regex alternation by an order of
+            # magnitude here, so keep one scan per keyword
+            for flag, keywords in _SECTION_KEYWORDS:
+                for keyword in keywords:
+                    if keyword in text_lower:
+                        sections[flag] = True
+                        break
         
         logging.info(f"Resume sections identified: {sections}")
         return sections
@@ -201,15 +289,13 @@ class ResumeParser:
         if not text:
             return ""
         
-        # Remove excessive whitespace
-        lines = [line.strip() for line in text.split('\n')]
-        lines = [line for line in lines if line]  # Remove empty lines
+        # Remove excessive whitespace and empty lines in one pass over the lines
+        lines = [line for line in map(str.strip, text.split('\n')) if line]
         
         # Join with single newlines
         cleaned = '\n'.join(lines)
         
         # Remove multiple spaces
-        import re
-        cleaned = re.sub(r' +', ' ', cleaned)
+        cleaned = _MULTISPACE_RE.sub(' ', cleaned)
         
         return cleaned
\ No newline at end of file
@@ -0,0 +1,148 @@
+"""
+Semantic Cache - Reuse LLM feedback for inputs that differ only in formatting
+"""
+import hashlib
+import logging
+import re
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Optional
+
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def _normalize(text: str) -> str:
+    """Collapse whitespace runs so re-pasted or re-extracted text keeps the same key"""
+    return _WHITESPACE_RE.sub(' ', text).strip()
+
+
+class SemanticCache:
+    """
+    Cache of LLM responses keyed on whitespace-normalized template arguments
+    
+    Every field must otherwise match exactly: term-frequency similarity scores
+    a different tech stack or seniority level as the same job, and reusing that
+    feedback would hand the user someone else's ATS score.
+    """
+    
+    def __init__(
+        self,
+        cache_dir: str,
+        max_entries: int = 10000,
+        enabled: bool = True
+    ):
+        """
+        Initialize semantic cache
+        
+        Args:
+            cache_dir: Directory holding the cache database (shared with the LLM cache)
+            max_entries: Maximum number of entries kept (least recently used are evicted)
+            enabled: Whether to serve and store responses at all
+        """
+        self.db_path = Path(cache_dir) / "llm_cache.sqlite3"
+        self.enabled = enabled
+        self.max_entries = max_entries
+        
+        self._initialize_db()
+        logging.info(f"Semantic cache initialized at: {self.db_path}")
+    
+    def _initialize_db(self):
+        """Create the normalized-responses table if it doesn't exist"""
+        try:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            with self._connect() as conn:
+                # Entries matched by similarity may hold feedback for a different job
+                conn.execute("DROP TABLE IF EXISTS similar_responses")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS normalized_responses ("
+                    "key TEXT PRIMARY KEY, response TEXT NOT NULL, used REAL NOT NULL)"
+                )
+                conn.execute(
+                    "CREATE INDEX IF NOT EXISTS normalized_responses_used "
+                    "ON normalized_responses (used)"
+                )
+        except Exception as e:
+            logging.error(f"Error initializing semantic cache: {str(e)}")
+    
+    @contextmanager
+    def _connect(self):
+        """Open a short-lived connection (safe to use across Streamlit threads)"""
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+    
+    @staticmethod
+    def _make_key(namespace: str, fields: Dict[str, str]) -> str:
+        """Hash the namespace and whitespace-normalized fields"""
+        raw = f"{namespace}\0" + "\0".join(
+            f"{k}={_normalize(v)}" for k, v in sorted(fields.items())
+        )
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+    
+    def lookup(self, namespace: str, fields: Dict[str, str]) -> Optional[str]:
+        """
+        Find a stored response for the same fields, ignoring whitespace differences
+        
+        Args:
+            namespace: Exact-match scope (e.g. model and template name)
+            fields: Template arguments
+            
+        Returns:
+            Cached response or None if no entry exists
+        """
+        if not self.enabled:
+            return None
+        
+        try:
+            key = self._make_key(namespace, fields)
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT response FROM normalized_responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return None
+                conn.execute(
+                    "UPDATE normalized_responses SET used = ? WHERE key = ?",
+                    (time.time(), key)
+                )
+            logging.info("Semantic cache hit")
+            return row[0]
+            
+        except Exception as e:
+            logging.error(f"Error in semantic cache lookup: {str(e)}")
+            return None
+    
+    def add(self, namespace: str, fields: Dict[str, str], response: str):
+        """
+        Store a response
+        
+        Args:
+            namespace: Exact-match scope (e.g. model and template name)
+            fields: Template arguments the response was generated from
+            response: LLM response
+        """
+        if not self.enabled:
+            return
+        
+        try:
+            key = self._make_key(namespace, fields)
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO normalized_responses (key, response, used) "
+                    "VALUES (?, ?, ?)",
+                    (key, response, time.time())
+                )
+                conn.execute(
+                    "DELETE FROM normalized_responses WHERE key IN ("
+                    "SELECT key FROM normalized_responses ORDER BY used DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                )
+                
+        except Exception as e:
+            logging.error(f"Error adding to semantic cache: {str(e)}")
\ No newline at end of file
@@ -1,19 +1,87 @@
 """
 Utility functions for the ATS Resume Builder
 """
+import functools
+import itertools
 import logging
 import os
+import re
+import string
+import tempfile
+import orjson
 import yaml
 from pathlib import Path
-from logging.handlers import RotatingFileHandler
+from logging.handlers import MemoryHandler, RotatingFileHandler
+
+try:
+    # libyaml's C parser, when PyYAML was built with it
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
+
+# Approximates LLM tokenization: one token per word or punctuation mark
+_PROMPT_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+# Look for patterns like "ATS Score: 75/100" or "Score: 75", in priority order.
+# Kept as separate searches: the literal prefixes make each scan much faster than
+# one alternation, and responses usually match the first pattern near the top
+_SCORE_PATTERNS = tuple(
+    re.compile(pattern, re.IGNORECASE)
+    for pattern in (
+        r'ATS Score[:\s]+(\d+)(?:/100)?',
+        r'Score[:\s]+(\d+)(?:/100)?',
+        r'(\d+)/100',
+    )
+)
+
+
+def _load_yaml(path):
+    """
+    Parse a YAML file, reusing the JSON sidecar of the last parse if unchanged
+    
+    The sidecar (<path>.cache.json) records the YAML file's mtime and size,
+    so any edit to the YAML invalidates it.
+    """
+    stat = os.stat(path)
+    source = [stat.st_mtime_ns, stat.st_size]
+    cache_path = f"{path}.cache.json"
+    
+    try:
+        with open(cache_path, 'rb') as file:
+            cached = orjson.loads(file.read())
+        if cached['source'] == source:
+            return cached['data']
+    except (OSError, ValueError, TypeError, KeyError):
+        pass  # Missing, stale or unreadable sidecar: parse the YAML
+    
+    with open(path, 'r') as file:
+        data = yaml.load(file, Loader=_YamlLoader)
+    
+    try:
+        encoded = orjson.dumps({'source': source, 'data': data})
+        # orjson turns dates into strings and NaN into null; a warm load must
+        # return the same types as a cold one, so lossy configs get no sidecar
+        if orjson.loads(encoded)['data'] != data:
+            raise TypeError("YAML values don't survive a JSON round trip")
+        
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(cache_path) or '.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                file.write(encoded)
+            os.replace(tmp_path, cache_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    except (OSError, TypeError) as e:
+        # Read-only checkout or YAML values JSON can't hold exactly; just skip the sidecar
+        logging.debug(f"Not caching {path}: {str(e)}")
+    return data
 
 
 def load_config(config_path="config/config.yaml"):
     """Load configuration from YAML file"""
     try:
-        with open(config_path, 'r') as file:
-            config = yaml.safe_load(file)
-        return config
+        return _load_yaml(config_path)
     except FileNotFoundError:
         logging.warning(f"Config file not found at {config_path}, using defaults")
         return get_default_config()
@@ -30,13 +98,23 @@ def get_default_config():
             'model': 'mistral',
             'timeout': 120,
             'temperature': 0.7,
-            'max_tokens': 2000
+            'max_tokens': 2000,
+            'num_parallel': 4,
+            'quantization': 'q4_K_M',
+            'auto_pull_quantized': False,
+            'warm_up': True,
+            'keep_alive': '30m',
+            'max_prompt_tokens': {
+                'resume_text': 0,
+                'job_description': 1500
+            }
         },
         'paths': {
             'base_resume': 'data/base_resume.txt',
             'applications_csv': 'data/applications.csv',
             'log_file': 'data/logs/app.log',
-            'prompts': 'templates/prompts.yaml'
+            'prompts': 'templates/prompts.yaml',
+            'cache_dir': 'data/cache'
         },
         'scoring': {
             'keyword_weight': 0.35,
@@ -48,11 +126,17 @@ def get_default_config():
             'good_threshold': 60,
             'fair_threshold': 40
         },
+        'cache': {
+            'enabled': True,
+            'memory_entries': 256,
+            'semantic_max_entries': 10000
+        },
         'logging': {
             'level': 'INFO',
             'format': '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
             'max_bytes': 10485760,
-            'backup_count': 5
+            'backup_count': 5,
+            'buffer_records': 100
         }
     }
 
@@ -78,6 +162,14 @@ def setup_logging(config):
     file_handler.setFormatter(formatter)
     file_handler.setLevel(log_level)
     
+    # Buffer file records and write them in batches (immediately on errors)
+    buffered_file_handler = MemoryHandler(
+        capacity=config['logging'].get('buffer_records', 100),
+        flushLevel=logging.ERROR,
+        target=file_handler
+    )
+    buffered_file_handler.setLevel(log_level)
+    
     # Setup console handler
     console_handler = logging.StreamHandler()
     console_handler.setFormatter(formatter)
@@ -86,7 +178,7 @@ def setup_logging(config):
     # Configure root logger
     root_logger = logging.getLogger()
     root_logger.setLevel(log_level)
-    root_logger.addHandler(file_handler)
+    root_logger.addHandler(buffered_file_handler)
     root_logger.addHandler(console_handler)
     
     logging.info("Logging initialized successfully")
@@ -94,8 +186,8 @@ def setup_logging(config):
 
 def ensure_directories():
     """Ensure all required directories exist"""
+    # Leaf directories only; parents=True creates 'data' along with 'data/logs'
     directories = [
-        'data',
         'data/logs',
         'config',
         'src',
@@ -103,7 +195,9 @@ def ensure_directories():
     ]
     
     for directory in directories:
-        Path(directory).mkdir(parents=True, exist_ok=True)
+        # A stat is cheaper than mkdir's failed create on every warm start
+        if not os.path.isdir(directory):
+            Path(directory).mkdir(parents=True, exist_ok=True)
     
     logging.info("Directory structure verified")
 
@@ -111,8 +205,12 @@ def ensure_directories():
 def load_prompts(prompts_path="templates/prompts.yaml"):
     """Load prompt templates from YAML file"""
     try:
-        with open(prompts_path, 'r') as file:
-            prompts = yaml.safe_load(file)
+        prompts = _load_yaml(prompts_path)
+        
+        # Compile user templates up front so the first request doesn't pay for it
+        for template in (prompts or {}).values():
+            if isinstance(template, dict) and isinstance(template.get('user'), str):
+                compile_template(template['user'])
         return prompts
     except FileNotFoundError:
         logging.error(f"Prompts file not found at {prompts_path}")
@@ -122,6 +220,33 @@ def load_prompts(prompts_path="templates/prompts.yaml"):
         return {}
 
 
+@functools.lru_cache(maxsize=64)
+def compile_template(template):
+    """
+    Split a str.format template into (literal, field) pairs
+    
+    Returns None if the template uses conversions, format specs or
+    attribute/index lookups, which are left to str.format.
+    """
+    parts = []
+    for literal, field, format_spec, conversion in string.Formatter().parse(template):
+        if field is not None and (format_spec or conversion or not field.isidentifier()):
+            return None
+        parts.append((literal, field))
+    return tuple(parts)
+
+
+def render_template(template, **kwargs):
+    """Render a str.format template using its compiled form"""
+    parts = compile_template(template)
+    if parts is None:
+        return template.format(**kwargs)
+    return ''.join(
+        literal if field is None else literal + str(kwargs[field])
+        for literal, field in parts
+    )
+
+
 def save_base_resume(resume_text, config):
     """Save base resume to file"""
     try:
@@ -138,17 +263,25 @@ def save_base_resume(resume_text, config):
         return False
 
 
+@functools.lru_cache(maxsize=4)
+def _read_base_resume(path, mtime_ns, size):
+    """Read the base resume; keyed on mtime and size so edits are picked up"""
+    with open(path, 'r', encoding='utf-8') as file:
+        return file.read()
+
+
 def load_base_resume(config):
     """Load base resume from file"""
     try:
         base_resume_path = config['paths']['base_resume']
         
-        if not os.path.exists(base_resume_path):
+        try:
+            stat = os.stat(base_resume_path)
+        except FileNotFoundError:
             logging.warning("Base resume file not found")
             return None
         
-        with open(base_resume_path, 'r', encoding='utf-8') as file:
-            resume_text = file.read()
+        resume_text = _read_base_resume(base_resume_path, stat.st_mtime_ns, stat.st_size)
         
         if resume_text.strip():
             logging.info("Base resume loaded successfully")
@@ -165,22 +298,11 @@ def load_base_resume(config):
 def extract_score_from_response(response_text):
     """Extract ATS score from LLM response"""
     try:
-        # Look for patterns like "ATS Score: 75/100" or "Score: 75"
-        import re
-        
-        patterns = [
-            r'ATS Score[:\s]+(\d+)(?:/100)?',
-            r'Score[:\s]+(\d+)(?:/100)?',
-            r'(\d+)/100',
-            r'score[:\s]+(\d+)',
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, response_text, re.IGNORECASE)
+        for pattern in _SCORE_PATTERNS:
+            match = pattern.search(response_text)
             if match:
-                score = int(match.group(1))
-                # Ensure score is between 0 and 100
-                return max(0, min(100, score))
+                # Digits only, so the score just needs capping at 100
+                return min(100, int(match.group(1)))
         
         logging.warning("Could not extract score from response")
         return None
@@ -192,9 +314,8 @@ def extract_score_from_response(response_text):
 
 def format_feedback(feedback_text):
     """Format feedback text for better display"""
-    # Remove excessive newlines
-    feedback_text = '\n'.join(line for line in feedback_text.split('\n') if line.strip())
-    return feedback_text
+    # Remove excessive newlines (drop blank and whitespace-only lines)
+    return '\n'.join(filter(str.strip, feedback_text.split('\n')))
 
 
 def get_score_category(score):
@@ -215,4 +336,24 @@ def truncate_text(text, max_length=100):
     """Truncate text to specified length"""
     if len(text) <= max_length:
         return text
-    return text[:max_length] + "..."
+    return text[:max_length] + "\u2026"
+
+
+def count_tokens(text):
+    """Approximate the number of LLM tokens in text"""
+    return sum(1 for _ in _PROMPT_TOKEN_RE.finditer(text))
+
+
+def truncate_to_token_budget(text, max_tokens):
+    """Truncate text to roughly max_tokens LLM tokens, keeping the beginning"""
+    # Every token is at least one character long
+    if not text or len(text) <= max_tokens:
+        return text
+    
+    last = None
+    for last in itertools.islice(_PROMPT_TOKEN_RE.finditer(text), max_tokens - 1, max_tokens):
+        pass
+    
+    if last is None or not _PROMPT_TOKEN_RE.search(text, last.end()):
+        return text
+    return text[:last.end()]